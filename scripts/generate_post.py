@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import csv, datetime, html, pathlib, re, sys
+import argparse, csv, datetime, functools, html, json, multiprocessing, operator, os, pathlib, re, string, sys
 
 # ---------- Paths ----------
 REPO_ROOT  = pathlib.Path(__file__).resolve().parents[1]
@@ -9,6 +9,7 @@ BLOG_DIR   = REPO_ROOT / "blog"
 CONTENT    = REPO_ROOT / "content"
 TOPICS_CSV = CONTENT / "topics.csv"
 SITEMAP    = REPO_ROOT / "sitemap.xml"
+POSTS_JSON = CONTENT / "posts.json"
 SITE_URL   = "https://gwsautomate.com"  # change if needed
 
 # ---------- HTML Layout ----------
@@ -23,7 +24,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 <script async src="https://www.googletagmanager.com/gtag/js?id=G-4HY7P3F737"></script>
 <script>
   window.dataLayer = window.dataLayer || [];
-  function gtag(){dataLayer.push(arguments);}
+  function gtag(){{dataLayer.push(arguments);}}
   gtag('js', new Date());
 
   gtag('config', 'G-4HY7P3F737');
@@ -53,6 +54,12 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 </html>
 """
 
+# Parsed once at import; render_template just joins literals and values.
+_TEMPLATE_PARTS = [(lit, field) for lit, field, _, _ in string.Formatter().parse(HTML_TEMPLATE)]
+
+def render_template(**fields) -> str:
+  return "".join(lit + (fields[field] if field else "") for lit, field in _TEMPLATE_PARTS)
+
 # ---------- Curated copy library (prevents repetition) ----------
 SECTION_COPY = {
   "inbox-zero-classifier": {
@@ -129,66 +136,101 @@ HEADING_ALIASES = {
 }
 
 # ---------- Utilities ----------
+NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+@functools.lru_cache(maxsize=512)
 def _norm(s: str) -> str:
-  return re.sub(r"[^a-z0-9]+", " ", s.lower()).strip()
+  return NON_ALNUM_RE.sub(" ", s.lower()).strip()
 
+@functools.lru_cache(maxsize=512)
 def canonical_slug(slug: str) -> str:
   s = (slug or "").strip().lower()
   return SLUG_ALIASES.get(s, s)
 
+# Register normalised and exact-case forms once so the common case
+# (heading typed as in SECTION_COPY) is a plain dict hit without _norm.
+for _k, _v in list(HEADING_ALIASES.items()):
+  for _alias in (_norm(_k), _v.lower(), _v):
+    HEADING_ALIASES.setdefault(_alias, _v)
+del _k, _v, _alias
+
+@functools.lru_cache(maxsize=512)
 def canonical_heading(h: str) -> str:
-  return HEADING_ALIASES.get(_norm(h), h)
+  return HEADING_ALIASES.get(h) or HEADING_ALIASES.get(h.lower()) or HEADING_ALIASES.get(_norm(h), h)
 
-def load_topics():
+def iter_topics():
+  """Yield topic rows lazily so callers can stop at the first match."""
   if not TOPICS_CSV.exists():
     print(f"[error] topics.csv not found at {TOPICS_CSV}", file=sys.stderr)
     sys.exit(1)
   with open(TOPICS_CSV, newline="", encoding="utf-8") as f:
-    return list(csv.DictReader(f))
+    yield from csv.DictReader(f)
 
-def choose_next(topics):
-  """Pick the first topic whose target blog file doesn't exist yet."""
+def pending_topics(topics):
+  """Yield (topic, out_path) for every topic whose blog file doesn't exist yet."""
+  with os.scandir(BLOG_DIR) as it:
+    existing = {e.name for e in it if e.name.endswith(".html")}
   for t in topics:
     slug = canonical_slug(t.get("slug",""))
     if not slug:
       continue
-    out = BLOG_DIR / f"{slug}.html"
-    if not out.exists():
-      return t, out
-  return None, None
+    name = f"{slug}.html"
+    if name not in existing:
+      existing.add(name)  # a slug repeated in the CSV only gets one post
+      yield t, BLOG_DIR / name
+
+def choose_next(topics):
+  """Pick the first topic whose target blog file doesn't exist yet."""
+  return next(pending_topics(topics), (None, None))
+
+@functools.lru_cache(maxsize=512)
+def _section_copy(cslug: str, chead: str):
+  return SECTION_COPY.get(cslug, {}).get(chead)
 
 def render_section(slug: str, heading: str) -> str:
-  cslug = canonical_slug(slug)
-  chead = canonical_heading(heading)
-  lib = SECTION_COPY.get(cslug, {})
-  if chead in lib:
-    return lib[chead]
+  copy = _section_copy(canonical_slug(slug), canonical_heading(heading))
+  if copy is not None:
+    return copy
   # graceful default (no title repetition)
   return f"This section covers {heading.lower()} with practical steps and pitfalls to avoid."
 
-def make_post_html(t: dict) -> str:
+def post_title(t: dict) -> str:
+  return (t.get("title") or canonical_slug(t.get("slug","")).replace("-", " ").title()).strip()
+
+def make_post_html(t: dict, today: str = None) -> str:
   slug      = canonical_slug(t.get("slug",""))
-  title     = (t.get("title") or slug.replace("-", " ").title()).strip()
-  meta_desc = ((t.get("summary") or title)[:155]).replace('"','')
-  cta_text  = t.get("cta_text") or "Want ready-to-use scripts and templates?"
+  title     = post_title(t)
+  summary   = t.get("summary") or ""
+  # escape each CSV-supplied field exactly once, up front
+  safe = {k: html.escape(v) for k, v in (
+    ("title", title),
+    ("summary", summary),
+    ("meta_desc", (summary or title)[:155]),
+    ("cta_text", t.get("cta_text") or "Want ready-to-use scripts and templates?"),
+  )}
   sections  = [s.strip() for s in (t.get("sections") or "").split("|") if s.strip()]
 
   parts = []
-  if t.get("summary"):
-    parts.append(f'<p class="card">{html.escape(t["summary"])}</p>')
+  if summary:
+    parts.append(f'<p class="card">{safe["summary"]}</p>')
   for h in sections:
-    parts.append(f"<h2>{h}</h2>\n<p>{render_section(slug, h)}</p>")
+    parts.append(f"<h2>{html.escape(h)}</h2>\n<p>{html.escape(render_section(slug, h))}</p>")
 
-  return HTML_TEMPLATE.format(
-    title=title,
-    meta_desc=meta_desc,
-    date=datetime.date.today().strftime("%B %d, %Y"),
+  return render_template(
+    title=safe["title"],
+    meta_desc=safe["meta_desc"],
+    date=today or datetime.date.today().strftime("%B %d, %Y"),
     body="\n\n".join(parts),
-    cta_text=cta_text
+    cta_text=safe["cta_text"]
   )
 
+LOC_RE = re.compile(rb"<loc>\s*([^<]+?)\s*</loc>")
+
 def update_sitemap(slug: str):
-  url = f"{SITE_URL}/blog/{slug}.html"
+  update_sitemap_batch([slug])
+
+def update_sitemap_batch(slugs):
+  """Append any missing post URLs to the sitemap in one read and one write."""
   if not SITEMAP.exists():
     base = f"""<?xml version="1.0" encoding="UTF-8"?>
 <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
@@ -196,40 +238,110 @@ def update_sitemap(slug: str):
   <url><loc>{SITE_URL}/blog/</loc><priority>0.6</priority></url>
 </urlset>"""
     SITEMAP.write_text(base, encoding="utf-8")
-  xml = SITEMAP.read_text(encoding="utf-8")
-  if url not in xml:
-    xml = xml.replace("</urlset>", f"  <url><loc>{url}</loc><priority>0.8</priority></url>\n</urlset>")
-    SITEMAP.write_text(xml, encoding="utf-8")
+  with open(SITEMAP, "r+b") as f:
+    data = f.read()
+    locs = set(LOC_RE.findall(data))
+    new = []
+    for slug in slugs:
+      loc = f"{SITE_URL}/blog/{slug}.html".encode("utf-8")
+      if loc not in locs:
+        locs.add(loc)
+        new.append(b"  <url><loc>" + loc + b"</loc><priority>0.8</priority></url>\n")
+    if not new:
+      return
+    end = data.rfind(b"</urlset>")
+    if end < 0:
+      print(f"[warn] no </urlset> in {SITEMAP}; not adding {len(new)} URL(s)", file=sys.stderr)
+      return
+    # overwrite from the closing tag onwards instead of rewriting the whole file
+    tail = data[end:]
+    f.seek(end)
+    f.write(b"".join(new) + tail)
+    f.truncate()
 
 # ---- Blog index helpers ----
-TITLE_RE = re.compile(r"<h1[^>]*>(.*?)</h1>", re.IGNORECASE | re.DOTALL)
-PARA_RE  = re.compile(r"<p[^>]*>(.*?)</p>",  re.IGNORECASE | re.DOTALL)
-def strip_tags(s: str) -> str: return re.sub(r"<[^>]+>", "", s)
+TAG_RE   = re.compile(r"<[^>]+>")
+# same mapping as html.escape(quote=True), applied in one C-level pass
+_HTML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"})
+def strip_tags(s: str) -> str: return TAG_RE.sub("", s)
 
-def human_date(path: pathlib.Path) -> str:
-  ts = datetime.datetime.fromtimestamp(path.stat().st_mtime)
+def first_tag_text(txt: str, tag: str):
+  """Inner HTML of the first <tag ...>...</tag>, or None; plain str.find, no regex."""
+  i = txt.find(f"<{tag}")
+  if i < 0: return None
+  j = txt.find(">", i) + 1
+  k = txt.find(f"</{tag}>", j)
+  if j <= 0 or k < 0: return None
+  return txt[j:k]
+
+def human_date(mtime: float) -> str:
+  ts = datetime.datetime.fromtimestamp(mtime)
   return ts.strftime("%b %d, %Y")
 
+def load_manifest() -> dict:
+  """filename -> {name, title, snippet, mtime} from content/posts.json.
+
+  Entries are authoritative: the index trusts them instead of re-reading the
+  post, so delete a post's entry to have it picked up again after an edit.
+  """
+  try:
+    with open(POSTS_JSON, encoding="utf-8") as f:
+      entries = json.load(f)
+  except (OSError, ValueError):
+    return {}
+  return {e["name"]: e for e in entries if isinstance(e, dict) and e.get("name")}
+
+def save_manifest(manifest: dict):
+  entries = sorted(manifest.values(), key=operator.itemgetter("mtime"), reverse=True)
+  with open(POSTS_JSON, "w", encoding="utf-8") as f:
+    json.dump(entries, f, indent=2, ensure_ascii=False)
+    f.write("\n")
+
+def record_posts(written):
+  """Register freshly written (path, topic) pairs so the index never has to parse them."""
+  manifest = load_manifest()
+  for path, t in written:
+    manifest[path.name] = {"name": path.name, "title": post_title(t),
+                           "snippet": (t.get("summary") or "")[:140],
+                           "mtime": path.stat().st_mtime}
+  save_manifest(manifest)
+
 def update_blog_index():
   posts, seen = [], set()
-  for p in BLOG_DIR.glob("*.html"):
+  manifest, fresh = load_manifest(), {}
+  with os.scandir(BLOG_DIR) as it:
+    files = [e for e in it if e.name.endswith(".html") and not e.name.startswith(".")]
+  for p in files:
     if p.name.lower() == "index.html": continue
-    txt = p.read_text(encoding="utf-8", errors="ignore")
-    m   = TITLE_RE.search(txt)
-    title = strip_tags(m.group(1)).strip() if m else p.stem.replace("-", " ").title()
+    entry = manifest.get(p.name)
+    if not entry:
+      # post not written by this script: parse it once and remember the result
+      # (DirEntry caches its stat, so this is the only one for the file)
+      with open(p.path, encoding="utf-8", errors="ignore") as f:
+        txt = f.read()
+      h1   = first_tag_text(txt, "h1")
+      para = first_tag_text(txt, "p")
+      entry = {
+        "name": p.name,
+        "title": strip_tags(h1).strip() if h1 is not None else p.name[:-5].replace("-", " ").title(),
+        "snippet": strip_tags(para).strip()[:140] if para is not None else "",
+        "mtime": p.stat().st_mtime,
+      }
+    fresh[p.name] = entry
+    title = entry["title"]
     if title.lower() in seen:
       continue  # de-dup by title
     seen.add(title.lower())
-    m2 = PARA_RE.search(txt)
-    snippet = strip_tags(m2.group(1)).strip() if m2 else ""
-    posts.append({"name": p.name, "title": title, "snippet": snippet,
-                  "date": human_date(p), "mtime": p.stat().st_mtime})
-  posts.sort(key=lambda x: x["mtime"], reverse=True)
+    posts.append({"name": p.name, "title": title, "snippet": entry["snippet"],
+                  "date": human_date(entry["mtime"]), "mtime": entry["mtime"]})
+  if fresh != manifest:
+    save_manifest(fresh)
+  posts.sort(key=operator.itemgetter("mtime"), reverse=True)
 
   links = "\n".join(
     f'''    <li>
-      <a href="/blog/{p["name"]}">{html.escape(p["title"])}</a>
-      <div class="muted">{p["date"]} — {html.escape(p["snippet"][:140])}</div>
+      <a href="/blog/{p["name"]}">{p["title"].translate(_HTML_ESCAPE)}</a>
+      <div class="muted">{p["date"]} — {p["snippet"][:140].translate(_HTML_ESCAPE)}</div>
     </li>''' for p in posts
   )
 
@@ -260,21 +372,41 @@ def update_blog_index():
 
 # ---------- Main ----------
 def main():
+  ap = argparse.ArgumentParser(description="Generate blog posts from content/topics.csv.")
+  ap.add_argument("--all", action="store_true",
+                  help="generate every pending topic instead of just the next one")
+  args = ap.parse_args()
+
   BLOG_DIR.mkdir(parents=True, exist_ok=True)
   CONTENT.mkdir(parents=True, exist_ok=True)
 
-  topics = load_topics()
-  topic, out_path = choose_next(topics)
-  if not topic:
+  if args.all:
+    pending = list(pending_topics(iter_topics()))
+  else:
+    topic, out_path = choose_next(iter_topics())
+    pending = [(topic, out_path)] if topic else []
+  if not pending:
     print("No new topics to post — add rows to content/topics.csv")
     return
 
-  slug = canonical_slug(topic.get("slug",""))
-  html_post = make_post_html(topic)
-  out_path.write_text(html_post, encoding="utf-8")
-  update_sitemap(slug)
+  render = functools.partial(make_post_html, today=datetime.date.today().strftime("%B %d, %Y"))
+  topics = [t for t, _ in pending]
+  if len(topics) > 1:
+    # each post is a pure function of its CSV row
+    with multiprocessing.Pool() as pool:
+      html_posts = pool.map(render, topics)
+  else:
+    html_posts = [render(topics[0])]
+
+  written = []
+  for (topic, out_path), html_post in zip(pending, html_posts):
+    out_path.write_text(html_post, encoding="utf-8")
+    written.append((out_path, topic))
+  record_posts(written)
+  update_sitemap_batch([out_path.stem for out_path, _ in written])
   update_blog_index()
-  print(f"Generated: blog/{out_path.name}")
+  for out_path, _ in written:
+    print(f"Generated: blog/{out_path.name}")
 
 if __name__ == "__main__":
   main()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import pathlib, re
+from concurrent.futures import ThreadPoolExecutor
 
 GA_ID = "G-4HY7P3F737"  # <<-- PUT YOUR GA4 MEASUREMENT ID HERE
 
@@ -16,27 +17,40 @@ SNIPPET = f"""
 
 ROOT = pathlib.Path(".")
 HTML_FILES = list(ROOT.glob("*.html")) + list((ROOT / "blog").glob("*.html"))
+HEAD_CLOSE_RE = re.compile(r"</head>", re.IGNORECASE)
+GA_ID_BYTES = GA_ID.encode()
 
 def has_ga(html: str) -> bool:
     return (GA_ID in html) or ("googletagmanager.com/gtag/js?id=" in html)
 
+def has_ga_bytes(raw: bytes) -> bool:
+    # same probe as has_ga, on the undecoded file contents
+    return (GA_ID_BYTES in raw) or (b"googletagmanager.com/gtag/js?id=" in raw)
+
 def inject(html: str) -> str:
     if has_ga(html):
         return html
     # insert before closing </head>
-    return re.sub(r"</head>", SNIPPET + "\n</head>", html, flags=re.IGNORECASE, count=1)
+    return HEAD_CLOSE_RE.sub(SNIPPET + "\n</head>", html, count=1)
+
+def _process(f: pathlib.Path) -> int:
+    raw = f.read_bytes()
+    if has_ga_bytes(raw):
+        return 0  # already tagged; don't bother decoding
+    txt = raw.decode("utf-8", errors="ignore")
+    if HEAD_CLOSE_RE.search(txt) is None:
+        return 0  # skip odd files
+    new = inject(txt)
+    if new == txt:
+        return 0
+    f.write_text(new, encoding="utf-8")
+    print(f"Injected GA into: {f}")
+    return 1
 
 def main():
-    changed = 0
-    for f in HTML_FILES:
-        txt = f.read_text(encoding="utf-8", errors="ignore")
-        if "</head>" not in txt.lower():
-            continue  # skip odd files
-        new = inject(txt)
-        if new != txt:
-            f.write_text(new, encoding="utf-8")
-            changed += 1
-            print(f"Injected GA into: {f}")
+    # per-file work is read -> regex -> write, so threads overlap the I/O
+    with ThreadPoolExecutor(max_workers=max(1, min(32, len(HTML_FILES)))) as ex:
+        changed = sum(ex.map(_process, HTML_FILES))
     print(f"Done. Files updated: {changed}")
 
 if __name__ == "__main__":